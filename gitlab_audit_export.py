@@ -38,49 +38,117 @@ The script will try to resolve a path to an ID anyway.
 3) Reflog — reflog is local-only (per repository) and shows local operations (checkout, merge, pull, reset, etc.).
 It’s only available on the machine that holds that repo and depends on the user's git config and reflog expiration settings.
 
-4) Pagination — this script uses the 'per_page=100' option and follows GitLab's 'X-Next-Page' header to fetch pages.
+4) Pagination — this script uses the 'per_page=100' option. When GitLab sends the 'X-Total-Pages' header the remaining pages are fetched concurrently,
+otherwise it follows the 'Link: rel="next"' header GitLab sends for both offset and keyset pagination.
 
-5) Timestamps — this script tries to normalize timestamps using 'python-dateutil' library, if available.
-It can be installed with 'pip install python-dateutil' for nicer ISO timestamps.
+5) Timestamps — ISO 8601 timestamps (GitLab API, git with '--date=iso-strict') are parsed with the standard library. Other formats
+are normalized using 'python-dateutil' library, if available. It can be installed with 'pip install python-dateutil' for nicer ISO timestamps.
 
 6) API + Local combintation — this script is meant to combine Remote data (GitLab), meaning commits, branches, merges, user actions;
 and Local data (repo), meaning commit logs ('git log') and reflog actions ('git reflog').
 This is because GitLab’s API already provides complete branch info.
 
+7) Caching — if the 'requests-cache' library is installed ('pip install requests-cache'), GitLab API responses are cached in
+'gitlab_cache_<hash>.sqlite' and revalidated with ETag / If-None-Match, so re-runs only download what changed. Each GitLab URL and token
+gets its own cache file, and a failed request is never answered from the cache. Use '--no-cache' to turn it off.
+
+8) JSON — if the 'orjson' library is installed ('pip install orjson'), it is used to decode GitLab API responses and to encode the rows
+embedded in the HTML report, which is much faster than the standard 'json' module on large projects.
+
 """
 
 import argparse
+import base64
 import csv
+import dataclasses
+import functools
+import gzip
+import hashlib
 import html
+import itertools
+import json
 import os
 import subprocess
 import sys
-import time
+import threading
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
 from urllib.parse import quote_plus
 from datetime import datetime, timedelta
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 try:
     from dateutil import parser as dtparser
 except Exception:
     dtparser = None
 
+try:
+    import requests_cache
+except Exception:
+    requests_cache = None
+
+try:
+    import orjson
+except Exception:
+    orjson = None
+
+# Most GitLab API requests in flight at once for a whole GitLabClient, shared by the concurrent sources and page fetches
+MAX_WORKERS = 10
+
+# On-disk cache of GitLab API responses, revalidated with ETag / If-None-Match when 'requests-cache' is installed.
+# One file per GitLab URL and token ('{}' is a hash of both), so a token is never answered with data fetched by another one
+CACHE_FILE = 'gitlab_cache_{}.sqlite'
+
+# One exported row; '__slots__' keeps each row free of a per-instance dict.
+# Values copied from GitLab API responses may be None, the writers export them as empty cells
+@dataclasses.dataclass(slots=True)
+class AuditRow:
+    source: str
+    action_type: str
+    user_name: str | None
+    user_email: str | None
+    timestamp: str
+    ref: str | None
+    commit_sha: str | None
+    message: str | None
+    url: str | None
+
+# Columns of every exported row
+FIELDNAMES = tuple(f.name for f in dataclasses.fields(AuditRow))
+
 # ---------------------------
 # Helper: Date normalization and filtering
 # ---------------------------
 
+@functools.lru_cache(maxsize=4096)
+def parse_timestamp(s):
+    # Timestamps from GitLab and git's '--date=iso-strict' are strict ISO 8601, which 'fromisoformat' reads on every supported
+    # Python version (3.10 doesn't accept git's plain '--date=iso' form): try it before the slower dateutil.
+    # Cached because many rows share a timestamp (branch tips, commits and their merge requests)
+    if not s:
+        return None
+    try:
+        return datetime.fromisoformat(s.replace('Z', '+00:00'))
+    except ValueError:
+        pass
+    if dtparser:
+        try:
+            return dtparser.parse(s)
+        except Exception:
+            return None
+    return None
+
 def normalize_date(s):
     if not s:
         return ''
     if isinstance(s, datetime):
         return s.isoformat()
-    if dtparser:
-        try:
-            return dtparser.parse(s).isoformat()
-        except Exception:
-            return s
-    return s
+    dt = parse_timestamp(s)
+    return dt.isoformat() if dt else s
 
 def parse_date_any(s):
     if not s:
@@ -97,13 +165,12 @@ def parse_date_any(s):
     except Exception:
         return None
 
-def within_range(ts, start=None, end=None):
-    if not ts:
+def within_range(dt, start=None, end=None):
+    if not dt:
         return False if (start or end) else True
-    try:
-        dt = parse_date_any(ts)
-    except Exception:
-        return False
+    if dt.tzinfo is None:
+        # Naive timestamps are local time, like the range bounds
+        dt = dt.astimezone()
     if start and dt < start:
         return False
     if end and dt > end:
@@ -114,111 +181,207 @@ def within_range(ts, start=None, end=None):
 # Code to fetch data from GitLab API client
 # ---------------------------
 class GitLabClient:
-    def __init__(self, base_url, private_token, verify_ssl=True):
+    def __init__(self, base_url, private_token, verify_ssl=True, use_cache=True):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
+        if use_cache and requests_cache:
+            # The token selects the cache file and is not written to disk. No 'stale_if_error': a rejected token (401/403)
+            # or any other failure must raise instead of returning cached audit data
+            cache_key = hashlib.sha256(f"{self.base_url}\0{private_token}".encode('utf-8')).hexdigest()[:16]
+            self.session = requests_cache.CachedSession(CACHE_FILE.format(cache_key), expire_after=3600, cache_control=True,
+                                                        ignored_parameters=['PRIVATE-TOKEN'])
+        else:
+            self.session = requests.Session()
         self.session.headers.update({"PRIVATE-TOKEN": private_token})
+        # Reuse connections across the concurrent page fetches and retry transient errors (429 honours 'Retry-After')
+        retry = Retry(total=5, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=frozenset(['GET']))
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         self.verify = verify_ssl
+        self.proj = None
+        # Bounds concurrent requests across every thread using this client, not per listing call
+        self.slots = threading.BoundedSemaphore(MAX_WORKERS)
+
+    def _request(self, url, params=None):
+        with self.slots:
+            r = self.session.get(url, params=params, verify=self.verify)
+        if not r.ok:
+            raise RuntimeError(f"GitLab API error {r.status_code}: {r.text}")
+        return r
+
+    @staticmethod
+    def _json(r):
+        return orjson.loads(r.content) if orjson else r.json()
 
     def _get(self, path, params=None):
         url = f"{self.base_url}{path}"
         params = params or {}
         params.setdefault('per_page', 100)
-        all_items = []
-        while True:
-            r = self.session.get(url, params=params, verify=self.verify)
-            if not r.ok:
-                raise RuntimeError(f"GitLab API error {r.status_code}: {r.text}")
-            data = r.json()
-            if isinstance(data, dict):
-                return data
-            all_items.extend(data)
-            next_page = r.headers.get('X-Next-Page') or ''
-            if not next_page:
-                break
-            params['page'] = next_page
-            time.sleep(0.1)
+        r = self._request(url, params)
+        data = self._json(r)
+        if isinstance(data, dict):
+            return data
+        all_items = list(data)
+        # GitLab sends 'X-Total-Pages' when it can count the result set: fetch the remaining pages concurrently
+        total_pages = int(r.headers.get('X-Total-Pages') or 0)
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+                for page in pool.map(lambda n: self._json(self._request(url, {**params, 'page': n})), range(2, total_pages + 1)):
+                    all_items.extend(page)
+            return all_items
+        # Otherwise (keyset pagination, or more than 10,000 records) follow the 'Link: rel="next"' URL one page at a time
+        next_url = r.links.get('next', {}).get('url')
+        while next_url:
+            r = self._request(next_url)
+            all_items.extend(self._json(r))
+            next_url = r.links.get('next', {}).get('url')
         return all_items
 
     def get_project_by_path(self, project_path):
         return self._get(f"/api/v4/projects/{quote_plus(project_path)}")
 
-    def list_commits(self, proj):
-        return self._get(f"/api/v4/projects/{quote_plus(str(proj))}/repository/commits")
-
-    def list_branches(self, proj):
-        return self._get(f"/api/v4/projects/{quote_plus(str(proj))}/repository/branches")
-
-    def list_merge_requests(self, proj):
-        return self._get(f"/api/v4/projects/{quote_plus(str(proj))}/merge_requests", params={'state': 'all'})
+    def set_project(self, proj):
+        # Numeric ids are used as is, paths like 'group/project' are URL-encoded once for all the listing calls
+        proj = str(proj)
+        self.proj = proj if proj.isdigit() else quote_plus(proj)
+
+    def list_commits(self, since=None, until=None):
+        # Let GitLab filter by date so commits outside the range are never paginated through
+        params = {}
+        if since:
+            params['since'] = since.isoformat()
+        if until:
+            params['until'] = until.isoformat()
+        return self._get(f"/api/v4/projects/{self.proj}/repository/commits", params=params)
+
+    def list_branches(self):
+        # Keyset pagination (ordered by name) where GitLab supports it for branches, offset pagination otherwise
+        return self._get(f"/api/v4/projects/{self.proj}/repository/branches", params={'pagination': 'keyset'})
+
+    def list_merge_requests(self, updated_after=None, updated_before=None):
+        params = {'state': 'all'}
+        if updated_after:
+            params['updated_after'] = updated_after.isoformat()
+        if updated_before:
+            params['updated_before'] = updated_before.isoformat()
+        return self._get(f"/api/v4/projects/{self.proj}/merge_requests", params=params)
 
 # ---------------------------
 # Run local git helpers (commands that can be used without any remote connection or API, directly on /path/to/repo/.git) with git
 # ---------------------------
 def run_git(repo_path, args):
-    out = subprocess.check_output(['git'] + args, cwd=repo_path, text=True, stderr=subprocess.DEVNULL)
-    return out
+    # Stream stdout as raw bytes, line by line, instead of buffering and decoding the whole output of the command
+    with subprocess.Popen(['git'] + args, cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          bufsize=1 << 20) as p:
+        for line in p.stdout:
+            yield line.rstrip(b'\n')
+    if p.returncode:
+        raise subprocess.CalledProcessError(p.returncode, ['git'] + args)
+
+def run_git_fields(repo_path, args, nfields):
+    # Read the raw bytes of NUL separated output ('%x00' between fields, '-z' between records) and yield 'nfields' fields at a time
+    with subprocess.Popen(['git'] + args, cwd=repo_path, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          bufsize=1 << 20) as p:
+        fields = []
+        tail = b''
+        for chunk in iter(lambda: p.stdout.read(1 << 20), b''):
+            parts = (tail + chunk).split(b'\x00')
+            tail = parts.pop()
+            fields += parts
+            end = len(fields) - len(fields) % nfields
+            for i in range(0, end, nfields):
+                yield fields[i:i + nfields]
+            del fields[:end]
+        # The last record has no trailing separator
+        fields.append(tail)
+        if len(fields) == nfields:
+            yield fields
+    if p.returncode:
+        raise subprocess.CalledProcessError(p.returncode, ['git'] + args)
+
+# Let git skip commits older than the range instead of filtering them afterwards in Python.
+# Only the lower bound is given to git: '--since' / '--until' work on the committer date, which is normally at or after
+# the exported author date, so an upper bound would drop rebased or cherry-picked commits. 'within_range' applies 'end'.
+def date_limit_args(since=None):
+    return ['--since', since.isoformat()] if since else []
 
 # ---------------------------
 # Run 'git log' to get the full commit history (authors, messages, dates, merges, etc.)
 # ---------------------------
-def parse_git_log(repo_path):
-    fmt = "%H|%an|%ae|%ad|%s"
-    out = run_git(repo_path, ['log', '--all', f'--pretty=format:{fmt}', '--date=iso'])
-    rows = []
-    for line in out.splitlines():
-        p = line.split('|', 4)
-        if len(p) < 5:
-            continue
-        sha, an, ae, ad, msg = p
-        rows.append({
-            "source": "local_commit",
-            "action_type": "commit",
-            "user_name": an,
-            "user_email": ae,
-            "timestamp": ad,
-            "ref": "",
-            "commit_sha": sha,
-            "message": msg,
-            "url": ""
-        })
-    return rows
+def parse_git_log(repo_path, since=None):
+    fmt = "%H%x00%an%x00%ae%x00%ad%x00%s"
+    args = ['log', '--all', '-z', f'--pretty=format:{fmt}', '--date=iso-strict'] + date_limit_args(since)
+    for sha, an, ae, ad, msg in run_git_fields(repo_path, args, 5):
+        # SHAs and ISO dates are plain ASCII, only names and messages need a full UTF-8 decode
+        yield AuditRow(
+            source="local_commit",
+            action_type="commit",
+            user_name=an.decode('utf-8', 'replace'),
+            user_email=ae.decode('utf-8', 'replace'),
+            timestamp=ad.decode('ascii', 'replace'),
+            ref="",
+            commit_sha=sha.decode('ascii', 'replace'),
+            message=msg.decode('utf-8', 'replace'),
+            url=""
+        )
 
 # ---------------------------
 # Run 'git reflog' to local reference changes (local operations like commits, merges, resets, etc.)
 # ---------------------------
-def parse_reflog(repo_path):
-    out = run_git(repo_path, ['reflog', '--date=iso'])
-    rows = []
-    for line in out.splitlines():
-        parts = line.split(' ', 1)
-        sha = parts[0]
-        msg = parts[1] if len(parts) > 1 else ''
-        rows.append({
-            "source": "local_reflog",
-            "action_type": "reflog",
-            "user_name": "",
-            "user_email": "",
-            "timestamp": "",  # git reflog output doesn't easily include timestamp unless formatted
-            "ref": "",
-            "commit_sha": sha,
-            "message": msg,
-            "url": ""
-        })
-    return rows
+def parse_reflog(repo_path, since=None):
+    # '--since' filters on the date of each reflog entry, the same date that is exported as the timestamp
+    for line in run_git(repo_path, ['reflog', '--date=iso-strict'] + date_limit_args(since)):
+        sha, _, msg = line.partition(b' ')
+        # With '--date=iso-strict' the selector carries the date of the entry: 'HEAD@{2025-10-01T12:00:00+02:00}: commit: ...'
+        start = msg.find(b'@{')
+        end = msg.find(b'}', start)
+        ts = msg[start + 2:end] if start >= 0 and end > start else b''
+        yield AuditRow(
+            source="local_reflog",
+            action_type="reflog",
+            user_name="",
+            user_email="",
+            timestamp=ts.decode('ascii', 'replace'),
+            ref="",
+            commit_sha=sha.decode('ascii', 'replace'),
+            message=msg.decode('utf-8', 'replace'),
+            url=""
+        )
+
+# ---------------------------
+# Output file, gzip-compressed when '--compress' is given
+# ---------------------------
+def open_output(path, compress=False, newline=None):
+    if compress:
+        path += '.gz'
+        return gzip.open(path, 'wt', encoding='utf-8', newline=newline, compresslevel=6), path
+    return open(path, 'w', encoding='utf-8', newline=newline, buffering=1 << 20), path
 
 # ---------------------------
 # HTML Writer (interactive)
 # ---------------------------
-def write_interactive_html(rows, out_file):
-    # Collect fieldnames
-    keys = []
-    for r in rows:
-        for k in r.keys():
-            if k not in keys:
-                keys.append(k)
-
-    with open(out_file, 'w', encoding='utf-8') as fh:
+def write_interactive_html(rows, out_file, compress=False):
+    # Rows are embedded as gzip-compressed JSON, inflated and rendered by the browser a window at a time
+    get = attrgetter(*FIELDNAMES)
+    if orjson:
+        dumps = orjson.dumps
+    else:
+        dumps = lambda v: json.dumps(v, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    fh, out_file = open_output(out_file, compress)
+    # wbits=31 writes a gzip container, which is what DecompressionStream('gzip') expects
+    z = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = b''
+
+    def write_data(b):
+        # Compress and base64-encode as the rows come in, keeping the leftover bytes that don't fill a 3-byte base64 group
+        nonlocal pending
+        pending += z.compress(b)
+        cut = len(pending) - len(pending) % 3
+        fh.write(base64.b64encode(pending[:cut]).decode('ascii'))
+        pending = pending[cut:]
+
+    count = 0
+    with fh:
         fh.write("""<!DOCTYPE html>
 <html lang="en">
 <head>
@@ -231,166 +394,246 @@ th,td{border:1px solid #ddd;padding:6px;}
 th{background:#f2f2f2;cursor:pointer;}
 tr:nth-child(even){background:#fafafa;}
 input{margin-bottom:10px;padding:6px;width:300px;}
+#rowCount{margin-left:10px;color:#666;}
 </style>
 </head><body>
 <h2>GitLab Audit Export (Interactive)</h2>
-<input type="text" id="searchBox" placeholder="Search...">
+<input type="text" id="searchBox" placeholder="Search..."><span id="rowCount">Loading...</span>
 <table id="auditTable">
 <thead><tr>""")
-        for k in keys:
-            fh.write(f"<th>{html.escape(k)}</th>")
-        fh.write("</tr></thead><tbody>")
-        for r in rows:
-            fh.write("<tr>")
-            for k in keys:
-                v = r.get(k, '')
-                fh.write(f"<td>{html.escape(str(v))}</td>")
-            fh.write("</tr>")
-        fh.write("""</tbody></table>
+        fh.write("".join(f"<th>{html.escape(k)}</th>" for k in FIELDNAMES))
+        fh.write("""</tr></thead><tbody></tbody></table>
+<div id="sentinel"></div>
+<script type="application/gzip" id="rows">""")
+        # Base64 never contains '<', so the data can't close the <script> element
+        write_data(b'[')
+        # Batches are sliced off one shared iterator, so lists work as well as generators
+        rows = iter(rows)
+        while True:
+            batch = [[v or '' for v in get(r)] for r in itertools.islice(rows, 4096)]
+            if not batch:
+                break
+            write_data((b',' if count else b'') + dumps(batch)[1:-1])
+            count += len(batch)
+        write_data(b']')
+        pending += z.flush()
+        fh.write(base64.b64encode(pending).decode('ascii'))
+        fh.write("""</script>
 <script>
-// Simple sort + search
+// Sort + search on the in-memory rows, only the visible window is added to the DOM
+const PAGE=100;
 const table=document.getElementById('auditTable');
-const headers=table.querySelectorAll('th');
-headers.forEach((th,idx)=>{
+const tbody=table.tBodies[0];
+const rowCount=document.getElementById('rowCount');
+const sentinel=document.getElementById('sentinel');
+const collator=new Intl.Collator(undefined,{sensitivity:'base'});
+let rows=[];
+let haystack=[];
+let view=[];
+let shown=0;
+async function loadRows(){
+  const bytes=Uint8Array.from(atob(document.getElementById('rows').textContent),c=>c.charCodeAt(0));
+  const json=new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+  return JSON.parse(await new Response(json).text());
+}
+function more(){
+  const frag=document.createDocumentFragment();
+  const end=Math.min(shown+PAGE,view.length);
+  for(let i=shown;i<end;i++){
+    const tr=document.createElement('tr');
+    for(const v of rows[view[i]]){
+      const td=document.createElement('td');
+      td.textContent=v;
+      tr.appendChild(td);
+    }
+    frag.appendChild(tr);
+  }
+  tbody.appendChild(frag);
+  shown=end;
+}
+function render(){
+  tbody.replaceChildren();
+  shown=0;
+  more();
+  rowCount.textContent=view.length+' of '+rows.length+' rows';
+  // Re-observe so the observer reports again if the sentinel is still visible
+  observer.unobserve(sentinel);
+  observer.observe(sentinel);
+}
+const observer=new IntersectionObserver(entries=>{
+  if(entries[0].isIntersecting&&shown<view.length){
+    more();
+    observer.unobserve(sentinel);
+    observer.observe(sentinel);
+  }
+},{rootMargin:'200px'});
+// Current sort column (-1 = original order) and direction, kept when the search changes
+let sortIdx=-1;
+let sortAsc=true;
+function applySort(){
+  if(sortIdx<0)return;
+  view.sort((a,b)=>collator.compare(rows[a][sortIdx],rows[b][sortIdx])*(sortAsc?1:-1));
+}
+table.querySelectorAll('th').forEach((th,idx)=>{
   th.addEventListener('click',()=>{
-    const rows=[...table.tBodies[0].rows];
-    const asc=th.asc=!th.asc;
-    rows.sort((a,b)=>{
-      const av=a.cells[idx].innerText.trim().toLowerCase();
-      const bv=b.cells[idx].innerText.trim().toLowerCase();
-      return av.localeCompare(bv)*(asc?1:-1);
-    });
-    rows.forEach(r=>table.tBodies[0].appendChild(r));
+    sortAsc=th.asc=!th.asc;
+    sortIdx=idx;
+    applySort();
+    render();
   });
 });
 document.getElementById('searchBox').addEventListener('input',function(){
   const q=this.value.toLowerCase();
-  [...table.tBodies[0].rows].forEach(r=>{
-    r.style.display=[...r.cells].some(c=>c.innerText.toLowerCase().includes(q))?'':'none';
-  });
+  view=rows.map((r,i)=>i).filter(i=>haystack[i].includes(q));
+  applySort();
+  render();
+});
+loadRows().then(data=>{
+  rows=data;
+  haystack=rows.map(r=>r.join('\\u0001').toLowerCase());
+  view=rows.map((r,i)=>i);
+  render();
+}).catch(err=>{
+  // e.g. a browser without DecompressionStream, or a damaged data block
+  rowCount.textContent='Could not load the report data: '+err;
 });
 </script>
 </body></html>""")
-    print(f"Wrote interactive HTML: {out_file} ({len(rows)} rows)")
+    print(f"Wrote interactive HTML: {out_file} ({count} rows)")
+
+# ---------------------------
+# Rows of each data source, filtered to the date range
+# ---------------------------
+def gitlab_commit_rows(client, start_date, end_date):
+    rows = []
+    for c in client.list_commits(since=start_date, until=end_date):
+        raw = c.get('created_at') or c.get('committed_date')
+        dt = parse_timestamp(raw)
+        if not within_range(dt, start_date, end_date):
+            continue
+        rows.append(AuditRow(
+            source="gitlab_commit",
+            action_type="commit",
+            user_name=c.get('author_name'),
+            user_email=c.get('author_email'),
+            timestamp=normalize_date(dt) or raw or '',
+            ref="",
+            commit_sha=c.get('id'),
+            message=c.get('message','').replace('\n',' '),
+            url=c.get('web_url','')
+        ))
+    return rows
+
+def gitlab_branch_rows(client, start_date, end_date):
+    rows = []
+    for b in client.list_branches():
+        commit = b.get('commit',{})
+        raw = commit.get('committed_date')
+        dt = parse_timestamp(raw)
+        if not within_range(dt, start_date, end_date):
+            continue
+        rows.append(AuditRow(
+            source="gitlab_branch",
+            action_type="branch",
+            user_name="",
+            user_email="",
+            timestamp=normalize_date(dt) or raw or '',
+            ref=b.get('name'),
+            commit_sha=commit.get('id'),
+            message=commit.get('message',''),
+            url=b.get('web_url','')
+        ))
+    return rows
+
+def gitlab_merge_request_rows(client, start_date, end_date):
+    rows = []
+    for m in client.list_merge_requests(updated_after=start_date, updated_before=end_date):
+        raw = m.get('updated_at')
+        dt = parse_timestamp(raw)
+        if not within_range(dt, start_date, end_date):
+            continue
+        rows.append(AuditRow(
+            source="gitlab_merge_request",
+            action_type=f"merge_request_{m.get('state')}",
+            user_name=(m.get('author') or {}).get('name'),
+            user_email="",
+            timestamp=normalize_date(dt) or raw or '',
+            ref=f"{m.get('source_branch')}->{m.get('target_branch')}",
+            commit_sha=m.get('sha',''),
+            message=m.get('title',''),
+            url=m.get('web_url','')
+        ))
+    return rows
+
+def local_rows(entries, start_date, end_date):
+    return (e for e in entries if within_range(parse_timestamp(e.timestamp), start_date, end_date))
 
 # ---------------------------
 # Main data collection logic of the script
 # ---------------------------
 def collect_data(args):
-    rows = []
     start_date, end_date = None, None
     if args.months_back:
         start_date = datetime.now() - timedelta(days=30*args.months_back)
     if args.date_range:
         start_date = parse_date_any(args.date_range[0])
         end_date = parse_date_any(args.date_range[1])
+    # Compare against timezone-aware bounds, GitLab and git both give timestamps with an offset
+    start_date = start_date.astimezone() if start_date else None
+    end_date = end_date.astimezone() if end_date else None
 
-    client = None
+    # Each data source is independent: (error label, function returning its rows)
+    gitlab_sources = []
+    local_sources = []
     if args.gitlab_url and args.private_token:
-        client = GitLabClient(args.gitlab_url, args.private_token, verify_ssl=not args.insecure)
+        client = GitLabClient(args.gitlab_url, args.private_token, verify_ssl=not args.insecure, use_cache=not args.no_cache)
         try:
             proj = client.get_project_by_path(args.project)
             proj_id = proj['id']
         except Exception as e:
             print(f"Failed to resolve project path, using given id: {e}")
             proj_id = args.project
-        # For commits
-        try:
-            commits = client.list_commits(proj_id)
-            for c in commits:
-                ts = normalize_date(c.get('created_at') or c.get('committed_date'))
-                if not within_range(ts, start_date, end_date): 
-                    continue
-                rows.append({
-                    "source": "gitlab_commit",
-                    "action_type": "commit",
-                    "user_name": c.get('author_name'),
-                    "user_email": c.get('author_email'),
-                    "timestamp": ts,
-                    "ref": "",
-                    "commit_sha": c.get('id'),
-                    "message": c.get('message','').replace('\n',' '),
-                    "url": c.get('web_url','')
-                })
-        except Exception as e:
-            print(f"GitLab commits fetch error: {e}")
-        # For branches
-        try:
-            branches = client.list_branches(proj_id)
-            for b in branches:
-                commit = b.get('commit',{})
-                ts = normalize_date(commit.get('committed_date'))
-                if not within_range(ts, start_date, end_date):
-                    continue
-                rows.append({
-                    "source": "gitlab_branch",
-                    "action_type": "branch",
-                    "user_name": "",
-                    "user_email": "",
-                    "timestamp": ts,
-                    "ref": b.get('name'),
-                    "commit_sha": commit.get('id'),
-                    "message": commit.get('message',''),
-                    "url": b.get('web_url','')
-                })
-        except Exception as e:
-            print(f"GitLab branches fetch error: {e}")
-        # For merges & requests
-        try:
-            mrs = client.list_merge_requests(proj_id)
-            for m in mrs:
-                ts = normalize_date(m.get('updated_at'))
-                if not within_range(ts, start_date, end_date):
-                    continue
-                rows.append({
-                    "source": "gitlab_merge_request",
-                    "action_type": f"merge_request_{m.get('state')}",
-                    "user_name": (m.get('author') or {}).get('name'),
-                    "user_email": "",
-                    "timestamp": ts,
-                    "ref": f"{m.get('source_branch')}->{m.get('target_branch')}",
-                    "commit_sha": m.get('sha',''),
-                    "message": m.get('title',''),
-                    "url": m.get('web_url','')
-                })
-        except Exception as e:
-            print(f"GitLab merge requests fetch error: {e}")
-
+        client.set_project(proj_id)
+        gitlab_sources.append(("GitLab commits fetch", lambda: gitlab_commit_rows(client, start_date, end_date)))
+        # Branch tips mostly repeat commits already listed, so branches are only fetched on request
+        if args.include_branches:
+            gitlab_sources.append(("GitLab branches fetch", lambda: gitlab_branch_rows(client, start_date, end_date)))
+        gitlab_sources.append(("GitLab merge requests fetch", lambda: gitlab_merge_request_rows(client, start_date, end_date)))
     # Add local repo option
     if args.repo_path:
-        try:
-            for entry in parse_git_log(args.repo_path):
-                ts = entry.get('timestamp')
-                if not within_range(ts, start_date, end_date):
-                    continue
-                rows.append(entry)
-        except Exception as e:
-            print(f"Local git log error: {e}")
-        try:
-            for entry in parse_reflog(args.repo_path):
-                ts = entry.get('timestamp')
-                if not within_range(ts, start_date, end_date):
-                    continue
-                rows.append(entry)
-        except Exception as e:
-            print(f"Local reflog error: {e}")
-
-    return rows
+        local_sources += [
+            ("Local git log", lambda: local_rows(parse_git_log(args.repo_path, since=start_date), start_date, end_date)),
+            ("Local reflog", lambda: local_rows(parse_reflog(args.repo_path, since=start_date), start_date, end_date)),
+        ]
+
+    # Fetch the GitLab sources at the same time in the background, rows are still yielded in the order above.
+    # The local git output is streamed straight through to the writer, one row at a time
+    with ThreadPoolExecutor(max_workers=max(len(gitlab_sources), 1)) as pool:
+        futures = [(label, pool.submit(fn)) for label, fn in gitlab_sources]
+        for label, future in futures:
+            try:
+                yield from future.result()
+            except Exception as e:
+                print(f"{label} error: {e}")
+        for label, fn in local_sources:
+            try:
+                yield from fn()
+            except Exception as e:
+                print(f"{label} error: {e}")
 
 # ---------------------------
 # CSV writer
 # ---------------------------
-def write_csv(rows, path):
-    if not rows:
-        print("No data to write.")
-        return
-    keys = sorted(set(k for r in rows for k in r.keys()))
-    with open(path, 'w', newline='', encoding='utf-8') as f:
-        w = csv.DictWriter(f, fieldnames=keys)
-        w.writeheader()
-        for r in rows:
-            w.writerow({k: r.get(k,'') for k in keys})
-    print(f"Wrote {len(rows)} rows to CSV: {path}")
+def write_csv(rows, path, compress=False):
+    get = attrgetter(*FIELDNAMES)
+    count = 0
+    f, path = open_output(path, compress, newline='')
+    with f:
+        w = csv.writer(f)
+        w.writerow(FIELDNAMES)
+        for count, r in enumerate(rows, 1):
+            w.writerow(get(r))
+    print(f"Wrote {count} rows to CSV: {path}")
 
 # ---------------------------
 # CLI options
@@ -405,7 +648,10 @@ def parse_args():
     p.add_argument("--output-file", default="audit_output.html")
     p.add_argument("--months-back", type=int, help="Only include data newer than N months")
     p.add_argument("--date-range", nargs=2, metavar=('FROM','TO'), help="Filter by explicit date range (e.g. 2025-07-24 2025-10-02)")
+    p.add_argument("--include-branches", action='store_true', help="Also export GitLab branches (one row per branch tip)")
+    p.add_argument("--compress", action='store_true', help="Write the output gzip-compressed, adding '.gz' to the file name")
     p.add_argument("--insecure", action='store_true', help="Disable SSL verify")
+    p.add_argument("--no-cache", action='store_true', help="Do not cache GitLab API responses in 'gitlab_cache_<hash>.sqlite'")
     return p.parse_args()
 
 # ---------------------------
@@ -414,13 +660,16 @@ def parse_args():
 def main():
     args = parse_args()
     rows = collect_data(args)
-    if not rows:
+    # Rows are generated lazily: peek at the first one to know whether there is anything to write
+    first = next(rows, None)
+    if first is None:
         print("No matching data found.")
         sys.exit(0)
+    rows = itertools.chain([first], rows)
     if args.output_format == "csv":
-        write_csv(rows, args.output_file)
+        write_csv(rows, args.output_file, compress=args.compress)
     else:
-        write_interactive_html(rows, args.output_file)
+        write_interactive_html(rows, args.output_file, compress=args.compress)
 
 if __name__ == "__main__":
     main()